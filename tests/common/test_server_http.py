@@ -7,14 +7,70 @@ It can be started with either --sse or --stream mode.
 """
 
 import asyncio
+import collections
 import json
 import argparse
+import multiprocessing
+import os
 import random
-from datetime import datetime
-from typing import Dict, Any
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Tuple
 from aiohttp import web
 import sys
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Bodies smaller than this are not worth the SIMD parser's setup cost.
+_SIMD_MIN_BYTES = 512
+
+# Payloads above this size are worth compressing before they hit the wire.
+_COMPRESS_MIN_BYTES = 1024
+
+_RNG_BUF_SIZE = 65536
+
+# Preformed SSE frame pieces; written as bytes so no frame ever goes through
+# a str round-trip.
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_SSE_CONNECTED = b'event: connected\ndata: {"type":"connected"}\n\n'
+_SSE_HEARTBEAT = b": heartbeat\n\n"
+
+def _json_response(obj: Any) -> web.Response:
+    """Build an application/json response without going through stdlib json
+
+    Accepts either a response dict or an already-serialized bytes body.
+    """
+    body = obj if isinstance(obj, (bytes, bytearray)) else _dumps(obj)
+    return web.Response(body=body, content_type="application/json")
+
 class TestHttpMCPServer:
     def __init__(self, delay_min: float = 0.1, delay_max: float = 0.5, error_rate: float = 0.05):
         self.delay_min = delay_min
@@ -35,166 +91,310 @@ class TestHttpMCPServer:
             "database://users/table"
         ]
 
+        # Draw uniforms from a preallocated NumPy buffer when available to
+        # amortize RNG cost; fall back to the scalar stdlib generator.
+        if np is not None:
+            self._rng = np.random.default_rng()
+            self._rng_buf = self._rng.random(_RNG_BUF_SIZE)
+            self._rng_idx = 0
+        else:
+            self._rng_buf = None
+            self._rand = random.random
+
+        # The tool and resource entries are static, so build them (including
+        # the uri -> name split) once and share the lists everywhere they
+        # are needed; they are never mutated after this point.
+        self._tools_items = [
+            {
+                "name": name,
+                "description": f"Test {name} tool",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "input": {"type": "string"}
+                    }
+                }
+            }
+            for name in self.tools
+        ]
+        self._resources_items = [
+            {
+                "uri": uri,
+                "name": uri.split("://", 1)[1],
+                "mimeType": "text/plain"
+            }
+            for uri in self.resources
+        ]
+
+        # Responses for these methods are identical apart from the request id,
+        # so serialize them once up front and splice the id in per request.
+        self._templates = {
+            "initialize": self._make_template({
+                "protocolVersion": "2024-11-05",
+                "serverInfo": {
+                    "name": "test-http-mcp-server",
+                    "version": "0.1.0"
+                },
+                "capabilities": {
+                    "tools": {"listChanged": True},
+                    "resources": {"listChanged": True},
+                    "prompts": {"listChanged": True}
+                }
+            }),
+            "tools/list": self._make_template({"tools": self._tools_items}),
+            "resources/list": self._make_template({"resources": self._resources_items}),
+            "prompts/list": self._make_template({
+                "prompts": [
+                    {
+                        "name": "test_prompt",
+                        "description": "A test prompt",
+                        "arguments": []
+                    }
+                ]
+            }),
+        }
+
+        # Log timestamps only need second granularity, so format once per
+        # second in _tick instead of on every log call.
+        self._ts = time.strftime("%H:%M:%S")
+
+        # Log lines are queued and drained in batches by _log_writer; the
+        # event is created in _start_background on the server's loop, and
+        # until then log falls back to writing synchronously.
+        self._log_q = collections.deque()
+        self._log_evt = None
+
+        # Error envelopes get the same treatment as the static responses:
+        # one precompiled byte template with placeholders for the varying
+        # fields, filled by _render_error.
+        self._err_tmpl = b'{"jsonrpc":"2.0","id":__ID__,"error":{"code":__C__,"message":__M__}}'
+
+        # Reused across requests; simdjson amortizes its internal buffers
+        # when the same parser instance handles every body.
+        self._simd = simdjson.Parser() if simdjson is not None else None
+
+        # Serialization of dynamic results runs on this pool; orjson releases
+        # the GIL while encoding, so large bodies overlap with other
+        # connections' I/O instead of blocking the event loop.
+        self._pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+        # O(1) hash dispatch for the dynamic methods; static methods are
+        # answered from the template cache before this table is consulted.
+        self._dispatch = {
+            "tools/call": self._handle_tools_call,
+            "resources/read": self._handle_resources_read,
+        }
+
+    @staticmethod
+    def _make_template(result: Dict[str, Any]) -> Tuple[bytes, bytes]:
+        """Pre-serialize a static response body, split around the id
+
+        The pre-encoded result (including the full tools/resources arrays)
+        lives in the suffix, so rendering never scans or re-encodes it.
+        """
+        tmpl = _dumps({"jsonrpc": "2.0", "id": "__ID__", "result": result})
+        prefix, _, suffix = tmpl.partition(b'"__ID__"')
+        return prefix, suffix
+
+    def _render_template(self, method: str, request_id: Any) -> bytes:
+        """Fill the cached template for `method` with the real request id"""
+        prefix, suffix = self._templates[method]
+        return prefix + _dumps(request_id) + suffix
+
+    def _render_error(self, request_id: Any, code: int, message: str) -> bytes:
+        """Fill the precompiled error envelope template"""
+        return (
+            self._err_tmpl
+            .replace(b"__ID__", _dumps(request_id))
+            .replace(b"__C__", str(code).encode())
+            .replace(b"__M__", _dumps(message))
+        )
+
+    def _next_rand(self) -> float:
+        """Return a uniform float in [0, 1), refilling the buffer in batches"""
+        if self._rng_buf is None:
+            return self._rand()
+        r = self._rng_buf[self._rng_idx]
+        self._rng_idx += 1
+        if self._rng_idx == _RNG_BUF_SIZE:
+            self._rng_buf = self._rng.random(_RNG_BUF_SIZE)
+            self._rng_idx = 0
+        return float(r)
+
+    def _parse_body(self, body: Any) -> Dict[str, Any]:
+        """Parse a JSON-RPC request body
+
+        Large bytes payloads go through the reused simdjson parser when the
+        library is installed; everything else falls back to _loads. The
+        simdjson path only materializes the top-level JSON-RPC fields the
+        handlers actually read, never the whole document.
+        """
+        if (
+            self._simd is not None
+            and isinstance(body, (bytes, bytearray))
+            and len(body) > _SIMD_MIN_BYTES
+        ):
+            try:
+                doc = self._simd.parse(body)
+                req = {"method": doc.get("method", "unknown"), "id": doc.get("id")}
+                params = doc.get("params")
+                if params is not None:
+                    # Copy before the parser is reused; lazy simdjson objects
+                    # are invalidated by the next parse. params may be an
+                    # Object (as_dict) or an Array (as_list) proxy.
+                    if hasattr(params, "as_dict"):
+                        params = params.as_dict()
+                    elif hasattr(params, "as_list"):
+                        params = params.as_list()
+                    req["params"] = params
+                return req
+            except Exception:
+                # A failed parse can leave the reused parser holding a stale
+                # document; replace it before falling back.
+                self._simd = simdjson.Parser()
+                raise
+        return _loads(body)
+
+    async def _tick(self):
+        """Refresh the cached log timestamp once per second"""
+        while True:
+            self._ts = time.strftime("%H:%M:%S")
+            await asyncio.sleep(1)
+
+    def _flush_logs(self):
+        """Write all queued log lines with one writelines + flush"""
+        if self._log_q:
+            sys.stderr.writelines(list(self._log_q))
+            self._log_q.clear()
+            sys.stderr.flush()
+
+    async def _log_writer(self):
+        """Drain the log queue, batching lines that arrive within ~10 ms"""
+        while True:
+            await self._log_evt.wait()
+            self._log_evt.clear()
+            await asyncio.sleep(0.01)
+            self._flush_logs()
+
+    async def _start_background(self, app):
+        """on_startup hook: spawn background tasks on the server's loop"""
+        self._log_evt = asyncio.Event()
+        self._tick_task = asyncio.create_task(self._tick())
+        self._log_task = asyncio.create_task(self._log_writer())
+
+    async def _encode(self, result: Any) -> bytes:
+        """Serialize a handler result off the event loop thread
+
+        Pre-serialized bytes (templates, error envelopes) pass through
+        untouched; dict results are encoded on the worker pool.
+        """
+        if isinstance(result, (bytes, bytearray)):
+            return result
+        return await asyncio.get_running_loop().run_in_executor(self._pool, _dumps, result)
+
     def log(self, message: str):
         """Log to stderr"""
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+        self._log_q.append(f"[{self._ts}] {message}\n")
+        if self._log_evt is not None:
+            self._log_evt.set()
+        else:
+            self._flush_logs()
 
-    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle an incoming JSON-RPC request"""
-        self.request_count += 1
-        method = request.get("method", "unknown")
-        request_id = request.get("id")
+    async def _simulate(self, method: str, request_id: Any) -> Any:
+        """Count and log the request, apply the random delay, maybe inject an error
 
+        Returns a pre-serialized error response when the simulated error
+        fires, else None.
+        """
+        self.request_count += 1
         self.log(f"Request #{self.request_count}: {method}")
 
-        # Add random delay
-        delay = random.uniform(self.delay_min, self.delay_max)
-        await asyncio.sleep(delay)
+        # Add random delay, snapped to 10 ms buckets so concurrent requests
+        # land on shared timer deadlines instead of each inserting a unique
+        # entry into the event loop's timer heap.
+        delay = self.delay_min + (self.delay_max - self.delay_min) * self._next_rand()
+        delay = round(delay * 100) / 100
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # sleep(0) is special-cased to a bare yield with no timer at all
+            await asyncio.sleep(0)
 
         # Simulate random errors
-        if random.random() < self.error_rate:
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"Simulated error for testing: {method}"
-                }
-            }
+        if self._next_rand() < self.error_rate:
+            return self._render_error(
+                request_id, -32603, f"Simulated error for testing: {method}"
+            )
+        return None
 
-        # Handle different methods
-        if method == "initialize":
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "protocolVersion": "2024-11-05",
-                    "serverInfo": {
-                        "name": "test-http-mcp-server",
-                        "version": "0.1.0"
-                    },
-                    "capabilities": {
-                        "tools": {"listChanged": True},
-                        "resources": {"listChanged": True},
-                        "prompts": {"listChanged": True}
-                    }
-                }
-            }
+    async def handle_request(self, request: Dict[str, Any]) -> Any:
+        """Handle an incoming JSON-RPC request
 
-        elif method == "tools/list":
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "tools": [
-                        {
-                            "name": name,
-                            "description": f"Test {name} tool",
-                            "inputSchema": {
-                                "type": "object",
-                                "properties": {
-                                    "input": {"type": "string"}
-                                }
-                            }
-                        }
-                        for name in self.tools
-                    ]
-                }
-            }
+        Returns either a response dict or, for static methods served from the
+        template cache, a pre-serialized bytes body.
+        """
+        method = request.get("method", "unknown")
+        request_id = request.get("id")
 
-        elif method == "tools/call":
-            params = request.get("params", {})
-            tool_name = params.get("name", "unknown")
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"Result from {tool_name}: Success!"
-                        }
-                    ]
-                }
-            }
+        error = await self._simulate(method, request_id)
+        if error is not None:
+            return error
 
-        elif method == "resources/list":
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "resources": [
-                        {
-                            "uri": uri,
-                            "name": uri.split("://")[1],
-                            "mimeType": "text/plain"
-                        }
-                        for uri in self.resources
-                    ]
-                }
-            }
+        # Handle different methods
+        if method in self._templates:
+            return self._render_template(method, request_id)
 
-        elif method == "resources/read":
-            params = request.get("params", {})
-            uri = params.get("uri", "unknown://unknown")
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "contents": [
-                        {
-                            "uri": uri,
-                            "mimeType": "text/plain",
-                            "text": f"Content of {uri}"
-                        }
-                    ]
-                }
-            }
+        handler = self._dispatch.get(method)
+        if handler is None:
+            return self._render_error(request_id, -32601, f"Method not found: {method}")
+        return await handler(request_id, request.get("params", {}))
 
-        elif method == "prompts/list":
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {
-                    "prompts": [
-                        {
-                            "name": "test_prompt",
-                            "description": "A test prompt",
-                            "arguments": []
-                        }
-                    ]
-                }
+    async def _handle_tools_call(self, request_id: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = params.get("name", "unknown")
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"Result from {tool_name}: Success!"
+                    }
+                ]
             }
+        }
 
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "error": {
-                    "code": -32601,
-                    "message": f"Method not found: {method}"
-                }
+    async def _handle_resources_read(self, request_id: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        uri = params.get("uri", "unknown://unknown")
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {
+                "contents": [
+                    {
+                        "uri": uri,
+                        "mimeType": "text/plain",
+                        "text": f"Content of {uri}"
+                    }
+                ]
             }
+        }
 
     async def handle_sse_post(self, request):
         """Handle SSE POST endpoint - send request and get response as SSE"""
         self.log("SSE POST request received")
-        response = web.StreamResponse()
-        response.headers['Content-Type'] = 'text/event-stream'
-        response.headers['Cache-Control'] = 'no-cache'
-        response.headers['Connection'] = 'keep-alive'
-        await response.prepare(request)
 
+        # Produce the payload before preparing the response, so compression
+        # can be decided from its actual size.
+        payload = b""
         try:
-            # Read request from POST body
-            body = await request.text()
+            # Read request from POST body as bytes; the parsers accept the
+            # raw buffer directly, so nothing transits through str.
+            body = await request.read()
             if body:
-                rpc_request = json.loads(body)
+                rpc_request = self._parse_body(body)
                 result = await self.handle_request(rpc_request)
-
-                # Send as SSE event
-                event_data = f"data: {json.dumps(result)}\n\n"
-                await response.write(event_data.encode())
+                payload = await self._encode(result)
         except Exception as e:
             self.log(f"SSE error: {e}")
             error_response = {
@@ -204,8 +404,23 @@ class TestHttpMCPServer:
                     "message": f"Parse error: {str(e)}"
                 }
             }
-            event_data = f"data: {json.dumps(error_response)}\n\n"
-            await response.write(event_data.encode())
+            payload = _dumps(error_response)
+
+        response = web.StreamResponse()
+        response.headers['Content-Type'] = 'text/event-stream'
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Connection'] = 'keep-alive'
+        if len(payload) > _COMPRESS_MIN_BYTES:
+            response.enable_compression(force=web.ContentCoding.gzip)
+        await response.prepare(request)
+
+        # Scratch buffer for frame assembly, reused for every frame this
+        # connection sends.
+        buf = bytearray()
+
+        if payload:
+            # Send as SSE event
+            await response.write(self._sse_frame(buf, payload))
 
         return response
 
@@ -218,17 +433,21 @@ class TestHttpMCPServer:
         response.headers['Connection'] = 'keep-alive'
         await response.prepare(request)
 
+        # Heartbeat frames are tiny; disable Nagle so each one leaves the
+        # kernel immediately instead of waiting to be coalesced.
+        sock = request.transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
         try:
             # Send initial connection event
-            event_data = f"event: connected\ndata: {{\"type\":\"connected\"}}\n\n"
-            await response.write(event_data.encode())
+            await response.write(_SSE_CONNECTED)
 
             # Keep connection open and send heartbeat every 30 seconds
             # In a real implementation, this would listen for server-initiated events
             while True:
                 await asyncio.sleep(30)
-                heartbeat = f": heartbeat\n\n"
-                await response.write(heartbeat.encode())
+                await response.write(_SSE_HEARTBEAT)
         except asyncio.CancelledError:
             self.log("SSE GET connection closed")
         except Exception as e:
@@ -236,16 +455,79 @@ class TestHttpMCPServer:
 
         return response
 
+    @staticmethod
+    def _sse_frame(buf: bytearray, payload: bytes) -> bytes:
+        """Assemble one SSE data frame in the connection's scratch buffer
+
+        Reusing the bytearray keeps frame assembly to a single slab per
+        write instead of fresh intermediate allocations per frame.
+        """
+        buf.clear()
+        buf += _SSE_PREFIX
+        buf += payload
+        buf += _SSE_SUFFIX
+        return bytes(buf)
+
+    # List responses can be streamed item by item instead of buffered whole.
+    _streamable = {"tools/list", "resources/list"}
+
+    @staticmethod
+    async def _stream_json_array(response, prefix: bytes, items, suffix: bytes):
+        """Write a JSON array to `response` one serialized item at a time"""
+        await response.write(prefix)
+        first = True
+        for item in items:
+            if first:
+                first = False
+            else:
+                await response.write(b",")
+            await response.write(_dumps(item))
+        await response.write(suffix)
+
+    async def _stream_list(self, request, rpc_request: Dict[str, Any]):
+        """Stream a tools/list or resources/list response incrementally
+
+        The envelope and each list item go out as separate chunks, so the
+        first byte reaches the client before the full list is serialized and
+        peak memory stays constant in the list length.
+        """
+        method = rpc_request.get("method")
+        request_id = rpc_request.get("id")
+
+        error = await self._simulate(method, request_id)
+        if error is not None:
+            return _json_response(error)
+
+        if method == "tools/list":
+            key = b"tools"
+            items = self._tools_items
+        else:
+            key = b"resources"
+            items = self._resources_items
+
+        response = web.StreamResponse()
+        response.headers['Content-Type'] = 'application/json'
+        await response.prepare(request)
+        prefix = b'{"jsonrpc":"2.0","id":' + _dumps(request_id) + b',"result":{"' + key + b'":['
+        await self._stream_json_array(response, prefix, items, b']}}')
+        return response
+
     async def handle_stream(self, request):
         """Handle streaming endpoint"""
         self.log("Stream connection established")
 
         try:
-            # Read request from POST body
-            body = await request.text()
-            rpc_request = json.loads(body)
+            # Read request from POST body as bytes (see handle_sse_post)
+            body = await request.read()
+            rpc_request = self._parse_body(body)
+            if rpc_request.get("method") in self._streamable:
+                return await self._stream_list(request, rpc_request)
             result = await self.handle_request(rpc_request)
-            return web.json_response(result)
+            response = _json_response(await self._encode(result))
+            if len(response.body) > _COMPRESS_MIN_BYTES:
+                # Negotiates against the request's Accept-Encoding.
+                response.enable_compression()
+            return response
         except Exception as e:
             self.log(f"Stream error: {e}")
             error_response = {
@@ -255,29 +537,73 @@ class TestHttpMCPServer:
                     "message": f"Parse error: {str(e)}"
                 }
             }
-            return web.json_response(error_response)
-
-def main():
-    parser = argparse.ArgumentParser(description="HTTP MCP Test Server")
-    parser.add_argument("--mode", choices=["sse", "stream"], default="sse", help="Server mode")
-    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
-    parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
-    args = parser.parse_args()
+            return _json_response(error_response)
 
+async def _serve(args, reuse_port: bool):
+    """Run one server instance until cancelled"""
     server = TestHttpMCPServer()
     app = web.Application()
+    app.on_startup.append(server._start_background)
 
     if args.mode == "sse":
         # Support both GET (persistent SSE) and POST (request/response)
         app.router.add_get('/sse', server.handle_sse_get)
         app.router.add_post('/sse', server.handle_sse_post)
-        endpoint = f"http://{args.host}:{args.port}/sse"
     else:
         app.router.add_post('/message', server.handle_stream)
-        endpoint = f"http://{args.host}:{args.port}/message"
 
-    print(f"Starting HTTP-{args.mode.upper()} MCP test server on {endpoint}", file=sys.stderr, flush=True)
-    web.run_app(app, host=args.host, port=args.port, print=lambda x: None)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, args.host, args.port, reuse_port=reuse_port)
+    await site.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+def _run_worker(args, reuse_port: bool):
+    if uvloop is not None:
+        uvloop.install()
+    try:
+        asyncio.run(_serve(args, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP MCP Test Server")
+    parser.add_argument("--mode", choices=["sse", "stream"], default="sse", help="Server mode")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes sharing the port via SO_REUSEPORT "
+                             "(try the CPU count for load testing)")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    path = '/sse' if args.mode == 'sse' else '/message'
+    endpoint = f"http://{args.host}:{args.port}{path}"
+    suffix = f" ({workers} workers)" if workers > 1 else ""
+    print(f"Starting HTTP-{args.mode.upper()} MCP test server on {endpoint}{suffix}",
+          file=sys.stderr, flush=True)
+
+    if workers == 1:
+        _run_worker(args, reuse_port=False)
+        return
+
+    # The kernel load-balances accept() across the workers; each process has
+    # its own server instance (and request counter), which is fine for this
+    # stateless test workload.
+    procs = [
+        multiprocessing.Process(target=_run_worker, args=(args, True), daemon=True)
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()